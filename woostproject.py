@@ -297,7 +297,7 @@ class Command(object):
                             serialize_bool(defaults[name]),
                             env
                         )
-                        for env, defaults in self.environments.iteritems()
+                        for env, defaults in self.environments.items()
                     )
                 )
 
@@ -312,7 +312,7 @@ class Command(object):
             )
 
     def process_parameters(self, parameters):
-        for key, value in parameters.iteritems():
+        for key, value in parameters.items():
             setattr(self, key, value)
 
     def __call__(self):
@@ -378,7 +378,7 @@ class Installer(object):
             metavar = "command"
         )
 
-        for name, command in self.commands.iteritems():
+        for name, command in self.commands.items():
             command_parser = subparsers.add_parser(
                 name,
                 help = command.help,
@@ -658,7 +658,7 @@ class Installer(object):
                             feature.description
                         )
                     )
-                    for key, feature in self.installer.features.iteritems()
+                    for key, feature in self.installer.features.items()
                 )
                 + "\n\nFeatures marked with a * character are installed by "
                   "default; other features will\nbe installed if needed."
@@ -1667,7 +1667,7 @@ class Installer(object):
                         self.deployment_scheme
                         or ", ".join(
                             "%s (%s)" % (defaults["deployment_scheme"], env)
-                            for env, defaults in self.environments.iteritems()
+                            for env, defaults in self.environments.items()
                         )
                     ),
                 choices = ["mod_rewrite", "mod_wsgi", "cherrypy"],
@@ -1729,7 +1729,7 @@ class Installer(object):
                         self.zodb_deployment_scheme
                         or ", ".join(
                             "%s (%s)" % (defaults["zodb_deployment_scheme"], env)
-                            for env, defaults in self.environments.iteritems()
+                            for env, defaults in self.environments.items()
                         )
                     ),
                 choices = ["zeo", "zeo_service"],
@@ -2277,7 +2277,7 @@ class Installer(object):
 
         def apply_environment_presets(self):
             for setting, default in \
-            self.environments[self.environment].iteritems():
+            self.environments[self.environment].items():
                 if getattr(self, setting, None) is None:
                     setattr(self, setting, default)
 
@@ -3840,14 +3840,12 @@ class Installer(object):
 
         def process_parameters(self, parameters):
 
-            self.bundle_defaults = {}
-
-            for key, value in parameters.iteritems():
-                if (
-                    key not in self.unexportable_parameters
-                    and value is not self.undefined_parameter
-                ):
-                    self.bundle_defaults[key] = value
+            self.bundle_defaults = {
+                key: value
+                for key, value in parameters.items()
+                if key not in self.unexportable_parameters
+                and value is not self.undefined_parameter
+            }
 
             Installer.CopyCommand.process_parameters(self, parameters)
 
@@ -3900,7 +3898,7 @@ class Installer(object):
                     write('\nif __name__ == "__main__":\n')
                     write("    installer = BundleInstaller()\n")
 
-                    for default in self.bundle_defaults.iteritems():
+                    for default in self.bundle_defaults.items():
                         write("    installer.unbundle.%s = %r\n" % default)
 
                     write("    installer.run_cli()\n")